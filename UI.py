@@ -1,10 +1,32 @@
+import atexit
 import os
 import sys
 import json
+import queue
+import re
 import tempfile
 import shutil
 import hashlib
+import hmac
 import getpass
+import threading
+import time
+from collections import Counter
+
+try:
+    import ahocorasick  # optional (pyahocorasick): one-pass multi-term keyword search
+except ImportError:
+    ahocorasick = None
+
+try:
+    import blake3  # SIMD + multithreaded content hashing for file fingerprints
+except ImportError:
+    blake3 = None
+
+try:
+    import orjson  # fast JSON encode/decode for records, config and report output
+except ImportError:
+    orjson = None
 
 
 RED = "\033[31m"
@@ -14,23 +36,26 @@ CYAN = "\033[96m"
 RESET = "\033[0m"
 
 # -----------------------------------------------------
-# PATH FIX FOR BACKEND IMPORTS
-# -----------------------------------------------------
-sys.path.append(os.path.abspath("."))
-
-# -----------------------------------------------------
-# PATH FIX FOR BACKEND IMPORTS
+# BACKEND IMPORTS (`backend` is installed via `pip install -e .`;
+# running `python UI.py` from the repo root also finds it next to this file)
 # -----------------------------------------------------
-sys.path.append(os.path.abspath("."))
-
 from backend.app.ingest import (
     extract_exif,
     compute_image_embedding,
-    extract_frames,
+    compute_image_embeddings_batch,
+    compute_text_embedding,
+    analyze_text_osint,
+    analyze_audio,
+    iter_distinct_frames,
+    iter_frames,
     scan_git_repo_for_secrets_with_reports,
 )
-from backend.app.faiss_manager import FaissManager  # 512-dim manager for images/video frames
-# ingest.py already defines compute_text_embedding/analyze_text_osint/analyze_audio :contentReference[oaicite:0]{index=0}
+from backend.app.faiss_manager import (  # 512-dim manager for images/video frames
+    IMAGE_INDEX_FACTORY,
+    TEXT_INDEX_FACTORY,
+    FaissManager,
+)
+from backend.app.storage import atomic_write
 
 
 # -----------------------------------------------------
@@ -38,28 +63,42 @@ from backend.app.faiss_manager import FaissManager  # 512-dim manager for images
 # -----------------------------------------------------
 
 # 512-dim FAISS for images + video frames
-faiss_manager = FaissManager(dim=512)  # :contentReference[oaicite:1]{index=1}
+# PQ codes with an SQ8 rerank (IMAGE_INDEX_FACTORY); exact flat search until 10k vectors are available to train on
+faiss_manager = FaissManager(dim=512, index_factory=IMAGE_INDEX_FACTORY)  # :contentReference[oaicite:1]{index=1}
 # 384-dim FAISS for text semantic search
-text_faiss = FaissManager(dim=384)     # separate index for MiniLM text embeddings
+# separate index for MiniLM text embeddings; OPQ+IVF+PQ keeps search sub-linear and
+# 48 bytes per text as the corpus grows (exact flat search until 10k texts are available)
+text_faiss = FaissManager(dim=384, index_factory=TEXT_INDEX_FACTORY)
 
 # Data directory and index/metadata paths
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "data"))
 os.makedirs(DATA_DIR, exist_ok=True)
 
 INDEX_PATH = os.path.join(DATA_DIR, "index.faiss")
-META_PATH = os.path.join(DATA_DIR, "faiss_meta.json")
+META_PATH = os.path.join(DATA_DIR, "faiss_meta.msgpack")
 
 TEXT_INDEX_PATH = os.path.join(DATA_DIR, "text_index.faiss")
-TEXT_META_PATH = os.path.join(DATA_DIR, "text_faiss_meta.json")
+TEXT_META_PATH = os.path.join(DATA_DIR, "text_faiss_meta.msgpack")
 
-OSINT_DB_PATH = os.path.join(DATA_DIR, "osint_records.json")
+# metadata is msgpack (see FaissManager.save); it used to be stored as JSON, which FaissManager.load still reads
+LEGACY_META_PATH = os.path.join(DATA_DIR, "faiss_meta.json")
+LEGACY_TEXT_META_PATH = os.path.join(DATA_DIR, "text_faiss_meta.json")
+
+# OSINT records are an append-only NDJSON log (one JSON object per line)
+OSINT_DB_PATH = os.path.join(DATA_DIR, "osint_records.ndjson")
+LEGACY_OSINT_DB_PATH = os.path.join(DATA_DIR, "osint_records.json")
 ADMIN_CONFIG_PATH = os.path.join(DATA_DIR, "admin_config.json")
 
 
+def _existing_meta_path(path, legacy_path):
+    return path if os.path.exists(path) else legacy_path
+
+
 def _load_faiss_index():
-    if os.path.exists(INDEX_PATH) and os.path.exists(META_PATH):
+    meta_path = _existing_meta_path(META_PATH, LEGACY_META_PATH)
+    if os.path.exists(INDEX_PATH) and os.path.exists(meta_path):
         try:
-            faiss_manager.load(INDEX_PATH, META_PATH)
+            faiss_manager.load(INDEX_PATH, meta_path)
             print(f"[INFO] Loaded image/video FAISS index with {faiss_manager.count()} items.")
         except Exception as e:
             print(f"[WARN] Could not load FAISS index: {e}")
@@ -75,9 +114,10 @@ def _save_faiss_index():
 
 
 def _load_text_faiss_index():
-    if os.path.exists(TEXT_INDEX_PATH) and os.path.exists(TEXT_META_PATH):
+    meta_path = _existing_meta_path(TEXT_META_PATH, LEGACY_TEXT_META_PATH)
+    if os.path.exists(TEXT_INDEX_PATH) and os.path.exists(meta_path):
         try:
-            text_faiss.load(TEXT_INDEX_PATH, TEXT_META_PATH)
+            text_faiss.load(TEXT_INDEX_PATH, meta_path)
             print(f"[INFO] Loaded text FAISS index with {text_faiss.count()} items.")
         except Exception as e:
             print(f"[WARN] Could not load text FAISS index: {e}")
@@ -92,28 +132,134 @@ def _save_text_faiss_index():
         print(f"[WARN] Failed to save text FAISS index: {e}")
 
 
+# FAISS persistence is debounced: scans only mark an index dirty, a background
+# thread saves dirty indexes every FAISS_FLUSH_INTERVAL seconds, and a final
+# flush runs at exit.
+FAISS_FLUSH_INTERVAL = 30.0
+_faiss_dirty = False
+_text_faiss_dirty = False
+_flush_lock = threading.Lock()
+
+
+def _mark_faiss_dirty():
+    global _faiss_dirty
+    _faiss_dirty = True
+
+
+def _mark_text_faiss_dirty():
+    global _text_faiss_dirty
+    _text_faiss_dirty = True
+
+
+def _flush_faiss_indexes():
+    global _faiss_dirty, _text_faiss_dirty
+    with _flush_lock:
+        # the managers are also dirty after a background training swapped in the trained index
+        if _faiss_dirty or faiss_manager.dirty:
+            _faiss_dirty = False
+            _save_faiss_index()
+        if _text_faiss_dirty or text_faiss.dirty:
+            _text_faiss_dirty = False
+            _save_text_faiss_index()
+
+
+def _finish_and_flush_faiss_indexes():
+    """Exit hook: let a running index training finish (its daemon thread would be killed
+    and the next launch would train from scratch), then save."""
+    for manager in (faiss_manager, text_faiss):
+        if manager.finish_training():
+            print("[INFO] Finished FAISS index training before exit.")
+    _flush_faiss_indexes()
+
+
+def _start_background_flush():
+    def _loop():
+        while True:
+            time.sleep(FAISS_FLUSH_INTERVAL)
+            _flush_faiss_indexes()
+
+    threading.Thread(target=_loop, name="faiss-flush", daemon=True).start()
+    atexit.register(_finish_and_flush_faiss_indexes)
+
+
+def _json_loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _dump_osint_record(record: dict) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. ints wider than 64 bits: let the stdlib handle it
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _print_json(obj):
+    """Pretty-print a report; orjson bytes go straight to stdout's buffer."""
+    if orjson is not None:
+        try:
+            data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            data = None
+        if data is not None:
+            sys.stdout.flush()  # keep ordering with earlier print() output
+            sys.stdout.buffer.write(data + b"\n")
+            sys.stdout.buffer.flush()
+            return
+    print(json.dumps(obj, indent=4))
+
+
 def _load_osint_db():
+    """Stream OSINT records from the NDJSON log without loading the whole file."""
     if not os.path.exists(OSINT_DB_PATH):
-        return []
+        return
     try:
-        with open(OSINT_DB_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return []
+        with open(OSINT_DB_PATH, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield _json_loads(line)
+                except ValueError:
+                    continue  # skip a torn / partially written line
+    except OSError:
+        return
 
 
 def _save_osint_db(records):
+    """Rewrite the whole NDJSON log (only used for migration; scans append)."""
     try:
-        with open(OSINT_DB_PATH, "w", encoding="utf-8") as f:
-            json.dump(records, f, indent=4)
+        with atomic_write(OSINT_DB_PATH, "wb") as f:
+            for rec in records:
+                f.write(_dump_osint_record(rec))
     except Exception as e:
         print(f"[WARN] Failed to save OSINT DB: {e}")
 
 
 def _append_osint_record(record: dict):
-    records = _load_osint_db()
-    records.append(record)
+    try:
+        with open(OSINT_DB_PATH, "ab") as f:
+            f.write(_dump_osint_record(record))
+    except Exception as e:
+        print(f"[WARN] Failed to append OSINT record: {e}")
+
+
+def _migrate_legacy_osint_db():
+    """Convert the old single JSON array DB into the NDJSON log (one-time)."""
+    if os.path.exists(OSINT_DB_PATH) or not os.path.exists(LEGACY_OSINT_DB_PATH):
+        return
+    try:
+        with open(LEGACY_OSINT_DB_PATH, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    except Exception as e:
+        print(f"[WARN] Could not read legacy OSINT DB: {e}")
+        return
+
     _save_osint_db(records)
+    if os.path.exists(OSINT_DB_PATH):
+        os.remove(LEGACY_OSINT_DB_PATH)
+        print(f"[INFO] Migrated {len(records)} OSINT records to {OSINT_DB_PATH}.")
 
 
 
@@ -121,8 +267,59 @@ def _append_osint_record(record: dict):
 # -----------------------------------------------------
 # ADMIN / AUTH HELPERS
 # -----------------------------------------------------
+# scrypt cost parameters (OWASP baseline: N=2^17, r=8, p=1 -> 128 MiB per guess)
+_SCRYPT_N = 2 ** 17
+_SCRYPT_R = 8
+_SCRYPT_P = 1
+_SCRYPT_MAXMEM = 256 * 1024 * 1024
+
+
+def _scrypt(pw: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(pw.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=_SCRYPT_MAXMEM, dklen=32)
+
+
 def _hash_password(pw: str) -> str:
-    return hashlib.sha256(pw.encode("utf-8")).hexdigest()
+    """Return a salted scrypt hash encoded as scrypt$n$r$p$salt$hash."""
+    salt = os.urandom(16)
+    dk = _scrypt(pw, salt, _SCRYPT_N, _SCRYPT_R, _SCRYPT_P)
+    return f"scrypt${_SCRYPT_N}${_SCRYPT_R}${_SCRYPT_P}${salt.hex()}${dk.hex()}"
+
+
+def _verify_password(stored: str, pw: str) -> bool:
+    if stored.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, dk = stored.split("$")
+            candidate = _scrypt(pw, bytes.fromhex(salt), int(n), int(r), int(p))
+            return hmac.compare_digest(candidate, bytes.fromhex(dk))
+        except ValueError:
+            return False
+    # legacy configs stored an unsalted SHA-256 hex digest
+    legacy = hashlib.sha256(pw.encode("utf-8")).hexdigest()
+    return hmac.compare_digest(legacy, stored)
+
+
+# Successful logins are remembered for a short while so repeat admin logins in
+# the same session skip the KDF. Keys are HMACs under a per-process random key,
+# so the cache never holds the password or a fast-to-crack digest of it.
+_LOGIN_CACHE_TTL = 300.0
+_LOGIN_CACHE_KEY = os.urandom(32)
+_login_cache = {}
+
+
+def _login_cache_key(user: str, pw: str, stored: str) -> bytes:
+    msg = "\0".join((user, pw, stored)).encode("utf-8")
+    return hmac.new(_LOGIN_CACHE_KEY, msg, hashlib.sha256).digest()
+
+
+def _login_cache_hit(key: bytes) -> bool:
+    now = time.monotonic()
+    hit = False
+    for cached, expiry in list(_login_cache.items()):
+        if expiry <= now:
+            del _login_cache[cached]
+        elif hmac.compare_digest(cached, key):
+            hit = True
+    return hit
 
 
 def _load_admin_config():
@@ -137,8 +334,12 @@ def _load_admin_config():
 
 def _save_admin_config(cfg: dict):
     try:
-        with open(ADMIN_CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=4)
+        if orjson is not None:
+            data = orjson.dumps(cfg, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(cfg, indent=4).encode("utf-8")
+        with atomic_write(ADMIN_CONFIG_PATH, "wb") as f:
+            f.write(data)
     except Exception as e:
         print(f"[WARN] Failed to save admin config: {e}")
 
@@ -182,57 +383,69 @@ def _admin_login() -> bool:
     user = input("Username: ").strip()
     pw = getpass.getpass("Password: ")
 
-    if user != cfg.get("username"):
-        print("[ERROR] Invalid admin username.")
+    stored = cfg.get("password_hash", "")
+    cache_key = _login_cache_key(user, pw, stored)
+    if _login_cache_hit(cache_key):
+        print("[INFO] Admin login successful.\n")
+        return True
+
+    # always run the KDF, even for a wrong username, so timing does not reveal it
+    pw_ok = _verify_password(stored, pw)
+    user_ok = hmac.compare_digest(user.encode("utf-8"), cfg.get("username", "").encode("utf-8"))
+    if not (user_ok and pw_ok):
+        print("[ERROR] Invalid admin username or password.")
         return False
 
-    if _hash_password(pw) != cfg.get("password_hash"):
-        print("[ERROR] Invalid admin password.")
-        return False
+    if not stored.startswith("scrypt$"):
+        cfg["password_hash"] = _hash_password(pw)
+        _save_admin_config(cfg)
+        print("[INFO] Upgraded stored admin password hash to scrypt.")
+        cache_key = _login_cache_key(user, pw, cfg["password_hash"])
 
+    _login_cache[cache_key] = time.monotonic() + _LOGIN_CACHE_TTL
     print("[INFO] Admin login successful.\n")
     return True
 
 
 def _admin_reset_database():
-    global faiss_manager, text_faiss
+    global faiss_manager, text_faiss, _faiss_dirty, _text_faiss_dirty
 
     confirm = input("This will DELETE all FAISS indexes and OSINT records. Type 'DELETE' to confirm: ").strip()
     if confirm != "DELETE":
         print("[INFO] Reset aborted.")
         return
 
-    # Remove index/meta/db files
-    for p in [INDEX_PATH, META_PATH, TEXT_INDEX_PATH, TEXT_META_PATH, OSINT_DB_PATH]:
-        try:
-            if os.path.exists(p):
-                os.remove(p)
-        except Exception as e:
-            print(f"[WARN] Could not remove {p}: {e}")
-
-    # Reinitialize managers
-    faiss_manager = FaissManager(dim=512)
-    text_faiss = FaissManager(dim=384)
+    # Hold the flush lock so a background flush cannot write the old
+    # indexes back after their files were removed
+    with _flush_lock:
+        # Remove index/meta/db files
+        for p in [INDEX_PATH, META_PATH, TEXT_INDEX_PATH, TEXT_META_PATH, OSINT_DB_PATH,
+                  LEGACY_META_PATH, LEGACY_TEXT_META_PATH, LEGACY_OSINT_DB_PATH]:
+            try:
+                if os.path.exists(p):
+                    os.remove(p)
+            except Exception as e:
+                print(f"[WARN] Could not remove {p}: {e}")
+
+        # Reinitialize managers
+        faiss_manager = FaissManager(dim=512, index_factory=IMAGE_INDEX_FACTORY)
+        text_faiss = FaissManager(dim=384, index_factory=TEXT_INDEX_FACTORY)
+        _faiss_dirty = _text_faiss_dirty = False
 
     print("[INFO] Database reset complete. All embeddings and OSINT records cleared.")
 
 
 def _admin_show_stats():
-    records = _load_osint_db()
-    total_records = len(records)
-    img = sum(1 for r in records if r.get("type") == "image")
-    vid = sum(1 for r in records if r.get("type") == "video")
-    git = sum(1 for r in records if r.get("type") == "git")
-    txt = sum(1 for r in records if r.get("type") == "text")
-    aud = sum(1 for r in records if r.get("type") == "audio")
+    # single streaming pass over the log
+    counts = Counter(r.get("type", "unknown") for r in _load_osint_db())
 
     print("\n[DB STATS]")
-    print(f"  Total OSINT records : {total_records}")
-    print(f"   - Images           : {img}")
-    print(f"   - Videos           : {vid}")
-    print(f"   - Git repos        : {git}")
-    print(f"   - Text files       : {txt}")
-    print(f"   - Audio files      : {aud}")
+    print(f"  Total OSINT records : {sum(counts.values())}")
+    print(f"   - Images           : {counts['image']}")
+    print(f"   - Videos           : {counts['video']}")
+    print(f"   - Git repos        : {counts['git']}")
+    print(f"   - Text files       : {counts['text']}")
+    print(f"   - Audio files      : {counts['audio']}")
     print(f"  FAISS (images/video frames) count : {faiss_manager.count()}")
     print(f"  FAISS (text semantic) count      : {text_faiss.count()}")
     print()
@@ -262,8 +475,8 @@ def admin_panel_ui():
 # -----------------------------------------------------
 # BANNER
 # -----------------------------------------------------
-def banner():
-    print(RED + BOLD +    """⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+# assembled once at import; banner() / banner2() just write them out
+_BANNER = RED + BOLD +    """⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢠⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢸⣧⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣿⣷⣄⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⡔⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
@@ -283,12 +496,15 @@ def banner():
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣸⣄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢸⣿⣿⣿⣿⣿⣿⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀ ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠸⠿⠭⠯⠭⠽⠿⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-    """ + RESET)
+    """ + RESET + "\n"
 
 
-def banner2():
-    print(
-        BOLD +
+def banner():
+    sys.stdout.write(_BANNER)
+
+
+_BANNER2 = (
+    BOLD +
         """          
                     ██████╗ """ + RED + """███████╗""" + RESET + BOLD + """██╗███╗   ██╗████████╗
                    ██╔═══██╗""" + RED + """██╔════╝""" + RESET + BOLD + """██║████╗  ██║╚══██╔══╝
@@ -302,8 +518,12 @@ def banner2():
                      UNAUTHORIZED ACCESS = TERMINATION
 
                            PS1 SECURITY SCANNER
-    """ + RESET
-    )
+    """ + RESET + "\n"
+)
+
+
+def banner2():
+    sys.stdout.write(_BANNER2)
     
 
     
@@ -311,45 +531,129 @@ def banner2():
 # -----------------------------------------------------
 # SAFE JSON CONVERTER
 # -----------------------------------------------------
-def safe_json(obj):
-    try:
-        from PIL.TiffImagePlugin import IFDRational
-    except Exception:
-        IFDRational = ()
-    if obj is None or isinstance(obj, (str, int, float, bool)):
+try:
+    from PIL.TiffImagePlugin import IFDRational
+except Exception:
+    IFDRational = None
+
+
+def _decode_bytes(obj):
+    return obj.decode(errors="ignore")
+
+
+def _identity(obj):
+    return obj
+
+
+# exact-type handlers for leaf values (dict lookup beats an isinstance chain)
+_LEAF_DISPATCH = {
+    str: _identity,
+    int: _identity,
+    float: _identity,
+    bool: _identity,
+    type(None): _identity,
+    bytes: _decode_bytes,
+    bytearray: _decode_bytes,
+}
+if IFDRational is not None:
+    _LEAF_DISPATCH[IFDRational] = float
+
+_CONTAINER_TYPES = (dict, list, tuple, set)
+
+
+def _safe_leaf(obj):
+    handler = _LEAF_DISPATCH.get(type(obj))
+    if handler is not None:
+        return handler(obj)
+    # subclasses (IntEnum, str subclasses, ...) fall back to isinstance
+    if isinstance(obj, (str, int, float, bool)):
         return obj
-    if isinstance(obj, IFDRational):
+    if IFDRational is not None and isinstance(obj, IFDRational):
         return float(obj)
     if isinstance(obj, (bytes, bytearray)):
-        return obj.decode(errors="ignore")
-    if isinstance(obj, dict):
-        return {safe_json(k): safe_json(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple, set)):
-        return [safe_json(i) for i in obj]
+        return _decode_bytes(obj)
     try:
         return str(obj)
     except Exception:
         return repr(obj)
 
 
+def _new_container(obj):
+    return {} if isinstance(obj, dict) else []
+
+
+def safe_json(obj):
+    """Convert EXIF-style nested data into JSON-serializable values.
+
+    Walks nested containers with an explicit stack instead of recursion.
+    """
+    if not isinstance(obj, _CONTAINER_TYPES):
+        return _safe_leaf(obj)
+
+    root = _new_container(obj)
+    stack = [(obj, root)]
+    while stack:
+        src, dst = stack.pop()
+        if isinstance(src, dict):
+            for k, v in src.items():
+                if isinstance(v, _CONTAINER_TYPES):
+                    child = _new_container(v)
+                    stack.append((v, child))
+                else:
+                    child = _safe_leaf(v)
+                dst[_safe_leaf(k)] = child
+        else:
+            for v in src:
+                if isinstance(v, _CONTAINER_TYPES):
+                    child = _new_container(v)
+                    stack.append((v, child))
+                else:
+                    child = _safe_leaf(v)
+                dst.append(child)
+    return root
+
+
 # -----------------------------------------------------
 # IMAGE SCAN
 # -----------------------------------------------------
+def _file_fingerprint(path: str) -> str:
+    """Content hash of a file, used to skip re-embedding files already in FAISS."""
+    if blake3 is not None:
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(path)
+        return "blake3:" + hasher.hexdigest()
+    hasher = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return "blake2b:" + hasher.hexdigest()
+
+
 def scan_image_ui():
     path = input("Enter image file path: ").strip()
     if not os.path.exists(path):
         print("[ERROR] File does not exist."); return
     print("[*] Scanning image...")
     try:
+        fingerprint = _file_fingerprint(path)
+        known_uid = faiss_manager.get_uid_by_hash(fingerprint)
+
         exif = extract_exif(path)
         clean_exif = safe_json(exif)
         if "piexif" in clean_exif and isinstance(clean_exif["piexif"], dict) and "thumbnail" in clean_exif["piexif"]:
             clean_exif["piexif"]["thumbnail"] = "[REMOVED]"
 
-        embedding = compute_image_embedding(path)
-        embedding_len = len(embedding) if embedding else 0
+        if known_uid:
+            # identical file already indexed: reuse its stored vector instead of re-embedding
+            meta = faiss_manager.metadata.get(known_uid, {})
+            print(f"[INFO] Identical image already scanned (source: {meta.get('source')}); skipping re-embedding.")
+            embedding = None
+            embedding_len = faiss_manager.dim
+        else:
+            embedding = compute_image_embedding(path)
+            embedding_len = len(embedding) if embedding else 0
 
-        uid = None
+        uid = known_uid
         if embedding and embedding_len == faiss_manager.dim:
             uid = faiss_manager.add(
                 embedding,
@@ -358,13 +662,14 @@ def scan_image_ui():
                     "filename": os.path.basename(path),
                     "source": path,
                     "exif_present": bool(clean_exif.get("raw_exif"))
-                }
+                },
+                file_hash=fingerprint
             )
-            _save_faiss_index()
+            _mark_faiss_dirty()
 
         # Console report
         print("[RESULT] Image Analysis:")
-        print(json.dumps({"filename": os.path.basename(path), "exif": clean_exif, "embedding_len": embedding_len}, indent=4))
+        _print_json({"filename": os.path.basename(path), "exif": clean_exif, "embedding_len": embedding_len})
 
         # Similarity search (against previously stored items: images + video frames)
         if uid:
@@ -388,6 +693,7 @@ def scan_image_ui():
             "source": path,
             "filename": os.path.basename(path),
             "faiss_uid": uid,
+            "fingerprint": fingerprint,
             "exif": clean_exif,
             "embedding_len": embedding_len,
         }
@@ -400,60 +706,123 @@ def scan_image_ui():
 # -----------------------------------------------------
 # VIDEO SCAN  (stores frames in FAISS + image-to-video similarity)
 # -----------------------------------------------------
+_FRAMES_DONE = object()
+
+
+def _produce_frames(video_path, out_dir, frame_queue, stop):
+    """Decoder thread: push frame paths into the bounded queue as they are written."""
+    try:
+        for f in iter_frames(video_path, out_dir=out_dir, fps=1):
+            if stop.is_set():
+                break
+            frame_queue.put(f)
+        frame_queue.put(_FRAMES_DONE)
+    except Exception as e:
+        frame_queue.put(e)
+
+
+def _iter_frame_queue(frame_queue):
+    while True:
+        item = frame_queue.get()
+        if item is _FRAMES_DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def _store_frame_batch(batch, source):
+    """Embed a batch of (frame_index, path) in one forward pass, add to FAISS and report image matches."""
+    embs = compute_image_embeddings_batch([f for _, f in batch])
+    emb_len = embs.shape[1] if len(embs) else 0
+    if emb_len != faiss_manager.dim:
+        return emb_len
+
+    # Add all frame embeddings to FAISS in one call
+    uids = faiss_manager.add_batch(
+        embs,
+        metadatas=[
+            {
+                "type": "video_frame",
+                "filename": os.path.basename(f),
+                "source": source,
+                "frame_index": idx
+            }
+            for idx, f in batch
+        ]
+    )
+    _mark_faiss_dirty()
+
+    # Optional: search for similar stored images, one batched query for the batch
+    all_matches = faiss_manager.search_batch(embs, k=4)
+    for (idx, _), uid, matches in zip(batch, uids, all_matches):
+        matches = [m for m in matches if m[0] != uid][:3]
+        if matches:
+            print(f"[FRAME MATCH] frame_{idx:05d}.jpg similar to:")
+            for rid, dist, meta in matches:
+                if meta.get("type") == "image":  # highlight similar images
+                    print(f"   - image {meta.get('filename')} (source: {meta.get('source')}) dist={dist:.4f}")
+    return emb_len
+
+
 def scan_video_ui():
     path = input("Enter video file path: ").strip()
     if not os.path.exists(path):
         print("[ERROR] File does not exist."); return
     print("[*] Scanning video frames...")
     tmpdir = tempfile.mkdtemp(prefix="frames_")
-    try:
-        frames = extract_frames(path, out_dir=tmpdir, fps=1)
-        print(f"[RESULT] Total frames extracted: {len(frames)}")
 
-        sample_info = []
+    # decoding runs in a producer thread while this thread hashes/embeds frames
+    frame_queue = queue.Queue(maxsize=32)
+    stop = threading.Event()
+    producer = threading.Thread(target=_produce_frames, args=(path, tmpdir, frame_queue, stop), daemon=True)
+    producer.start()
+    try:
         max_frames_to_store = 20  # avoid exploding FAISS in very long videos
-
-        for idx, f in enumerate(frames):
-            emb = compute_image_embedding(f)
-            emb_len = len(emb) if emb else 0
-
-            # Collect sample info for first few frames
-            if idx < 5:
-                sample_info.append({
-                    "frame": os.path.basename(f),
-                    "embedding_len": emb_len
-                })
-
-            if emb and emb_len == faiss_manager.dim and idx < max_frames_to_store:
-                # Add frame embedding to FAISS
-                uid = faiss_manager.add(
-                    emb,
-                    metadata={
-                        "type": "video_frame",
-                        "filename": os.path.basename(f),
-                        "source": path,
-                        "frame_index": idx
-                    }
-                )
-
-                # Optional: search for similar stored images for this frame
-                matches = faiss_manager.search_by_uid(uid, k=3)
-                if matches:
-                    print(f"[FRAME MATCH] frame_{idx:05d}.jpg similar to:")
-                    for rid, dist, meta in matches:
-                        if meta.get("type") == "image":  # highlight similar images
-                            print(f"   - image {meta.get('filename')} (source: {meta.get('source')}) dist={dist:.4f}")
-
-        _save_faiss_index()
+        batch_size = 8
+
+        num_frames = 0
+
+        def _counted_frames():
+            nonlocal num_frames
+            for f in _iter_frame_queue(frame_queue):
+                num_frames += 1
+                yield f
+
+        frames = _counted_frames()
+        kept = []
+        batch = []
+        emb_len = 0
+        # skip near-duplicate frames (static scenes) before paying for embeddings
+        for item in iter_distinct_frames(frames):
+            kept.append(item)
+            batch.append(item)
+            if len(batch) == batch_size or len(kept) == max_frames_to_store:
+                emb_len = _store_frame_batch(batch, path)
+                batch = []
+            if len(kept) == max_frames_to_store:
+                break
+        if batch:
+            emb_len = _store_frame_batch(batch, path)
+        for _ in frames:  # drain the rest of the video just to count frames
+            pass
+
+        print(f"[RESULT] Total frames extracted: {num_frames}")
+        print(f"[INFO] Distinct frames kept for embedding: {len(kept)}")
+
+        sample_info = [
+            {"frame": os.path.basename(f), "embedding_len": emb_len}
+            for _, f in kept[:5]
+        ]
 
         print("[INFO] Sample frame embeddings:")
-        print(json.dumps(sample_info, indent=4))
+        _print_json(sample_info)
 
         # Store a summarised OSINT record for the video
         record = {
             "type": "video",
             "source": path,
-            "num_frames": len(frames),
+            "num_frames": num_frames,
             "sample_frames": sample_info
         }
         _append_osint_record(record)
@@ -461,10 +830,16 @@ def scan_video_ui():
     except Exception as e:
         print(f"[FATAL ERROR] {e}")
     finally:
+        # unblock and wait for the decoder before removing its output dir
+        stop.set()
+        while producer.is_alive():
+            try:
+                frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
-
 # -----------------------------------------------------
 # GIT SECRET SCAN
 # -----------------------------------------------------
@@ -477,12 +852,11 @@ def scan_git_ui():
         print("[*] Cloning and scanning repository...")
         import git
         repo = git.Repo.clone_from(url, tmpdir)
-        from backend.app.ingest import scan_git_repo_for_secrets_with_reports  # ensure we use same logic :contentReference[oaicite:2]{index=2}
         report = scan_git_repo_for_secrets_with_reports(tmpdir, repo_url=url)
 
         print("\n[Raw Findings]")
         if report["raw_findings"]:
-            print(json.dumps(report["raw_findings"], indent=4))
+            _print_json(report["raw_findings"])
         else:
             print("No raw findings.")
 
@@ -543,13 +917,11 @@ def scan_text_ui():
         print("[WARN] File is empty.")
         return
 
-    from backend.app.ingest import analyze_text_osint, compute_text_embedding  # :contentReference[oaicite:3]{index=3}
-
     findings = analyze_text_osint(text)
     emb = compute_text_embedding(text)
 
     print("\n[OSINT TEXT FINDINGS]")
-    print(json.dumps(findings, indent=4))
+    _print_json(findings)
     print("\n[Embedding Length]:", len(emb))
 
     # Store findings in JSON DB
@@ -571,7 +943,7 @@ def scan_text_ui():
                 "findings": findings
             }
         )
-        _save_text_faiss_index()
+        _mark_text_faiss_dirty()
         print("[INFO] Text embedding stored in semantic search index.")
     elif emb:
         print("[INFO] Text embedding computed but dim mismatch; not stored in FAISS.")
@@ -586,9 +958,8 @@ def scan_audio_ui():
         print("[ERROR] File does not exist."); return
     print("[*] Analyzing audio...]")
     try:
-        from backend.app.ingest import analyze_audio  # :contentReference[oaicite:4]{index=4}
         result = analyze_audio(path)
-        print(json.dumps(result, indent=4))
+        _print_json(result)
 
         record = {
             "type": "audio",
@@ -604,24 +975,58 @@ def scan_audio_ui():
 # -----------------------------------------------------
 # KEYWORD-BASED SEARCH (existing behavior)
 # -----------------------------------------------------
+def _build_line_matcher(terms):
+    """Return a predicate over raw NDJSON lines: True if any (lowercased) term occurs.
+
+    ASCII terms are matched on bytes; several terms are matched in a single
+    pass (Aho-Corasick automaton when available, else one regex alternation).
+    """
+    all_ascii = all(t.isascii() for t in terms)
+
+    if len(terms) == 1:
+        term = terms[0]
+        if all_ascii:
+            term_bytes = term.encode("utf-8")
+            return lambda line: term_bytes in line.lower()
+        return lambda line: term in line.decode("utf-8", errors="ignore").lower()
+
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for i, term in enumerate(terms):
+            automaton.add_word(term, i)
+        automaton.make_automaton()
+        return lambda line: next(automaton.iter(line.decode("utf-8", errors="ignore").lower()), None) is not None
+
+    if all_ascii:
+        pattern = re.compile(b"|".join(re.escape(t.encode("utf-8")) for t in terms))
+        return lambda line: pattern.search(line.lower()) is not None
+    pattern = re.compile("|".join(re.escape(t) for t in terms))
+    return lambda line: pattern.search(line.decode("utf-8", errors="ignore").lower()) is not None
+
+
 def search_database_ui():
-    query = input("Enter search keyword or phrase: ").strip()
-    if not query:
+    query = input("Enter search keyword or phrase (comma-separate several to match any): ").strip()
+    terms = [t.strip().lower() for t in query.split(",") if t.strip()]
+    if not terms:
         print("[ERROR] Empty query.")
         return
-    q = query.lower()
 
-    records = _load_osint_db()
-    if not records:
+    if not os.path.exists(OSINT_DB_PATH) or os.path.getsize(OSINT_DB_PATH) == 0:
         print("[INFO] Database is empty. Run some scans first.")
         return
 
     print(f'\n[SEARCH] Looking for "{query}" in stored OSINT records...\n')
+    # Match against the raw NDJSON bytes and only parse lines that hit.
+    is_match = _build_line_matcher(terms)
     matches = []
-    for rec in records:
-        blob = json.dumps(rec, ensure_ascii=False).lower()
-        if q in blob:
-            matches.append(rec)
+    with open(OSINT_DB_PATH, "rb") as f:
+        for line in f:
+            if not is_match(line):
+                continue
+            try:
+                matches.append(_json_loads(line))
+            except ValueError:
+                continue
 
     if not matches:
         print("[INFO] No matches found.")
@@ -674,7 +1079,6 @@ def semantic_search_ui():
         print("[ERROR] Empty query.")
         return
 
-    from backend.app.ingest import compute_text_embedding  # :contentReference[oaicite:5]{index=5}
     emb = compute_text_embedding(query)
     if not emb or len(emb) != text_faiss.dim:
         print("[ERROR] Could not compute valid text embedding for this query.")
@@ -755,8 +1159,10 @@ def main_ui():
 # PROGRAM ENTRY
 # -----------------------------------------------------
 if __name__ == "__main__":
+    _migrate_legacy_osint_db()
     _load_faiss_index()
     _load_text_faiss_index()
+    _start_background_flush()
     banner()
     banner2()
     print( YELLOW + BOLD + "<< ⚠️  CAUTION ! DO NOT USE ON UNAUTHERISED NETWORKS OR SYSTEMS >>" + RESET)
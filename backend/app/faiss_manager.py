@@ -1,159 +1,590 @@
 import json
+import os
 import threading
+import time
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import faiss
 import numpy as np
 
+try:
+    import msgpack  # compact, fast and safe-to-load metadata encoding
+except ImportError:
+    msgpack = None
+
+from .storage import atomic_write
+
+# HNSW knobs: graph quality at build time and candidate-list size at query time
+# (higher = better recall, slower). efSearch can also be overridden per query.
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EFC', 100))
+HNSW_EF_SEARCH = int(os.getenv('HNSW_EFS', os.getenv('FAISS_EF_SEARCH', 64)))
+# OpenMP threads for multi-query search_batch calls on managers with an `omp_threads` cap
+BATCH_OMP_THREADS = int(os.getenv('FAISS_BATCH_OMP_THREADS', os.cpu_count() or 1))
+
+# index_factory strings of the UI / CLI indexes under data/ (both tools open the same files,
+# so they must agree). Images: OPQ-rotated 64-byte PQ codes for the first pass, with the top
+# hits reranked against an 8-bit scalar-quantized copy: 576 bytes per vector instead of 2048
+# as float32 (a full-precision RFlat copy would make it larger).
+IMAGE_INDEX_FACTORY = 'OPQ64,PQ64,Refine(SQ8)'
+# Text: OPQ+IVF+PQ keeps search sub-linear at 48 bytes per text as the corpus grows.
+TEXT_INDEX_FACTORY = 'OPQ48,IVF256,PQ48'
+
+
+def _find_hnsw(index):
+    """Return the HNSW graph inside a (possibly wrapped) index, or None."""
+    index = faiss.downcast_index(index)
+    while index is not None:
+        if hasattr(index, 'hnsw'):
+            return index.hnsw
+        # IDMap / pre-transform -> .index, refine -> .base_index, IVF (e.g. IVF1024_HNSW32) -> .quantizer
+        inner = (getattr(index, 'index', None) or getattr(index, 'base_index', None)
+                 or getattr(index, 'quantizer', None))
+        index = faiss.downcast_index(inner) if inner is not None else None
+    return None
+
+
+# metadata file formats, told apart by their first bytes:
+# msgpack (this prefix) or JSON ('{', older versions / msgpack not installed).
+# Both are plain data: loading a metadata file never runs code.
+_MSGPACK_MAGIC = b'OSMP'
+
+
+def _dump_meta(payload: Dict[str, Any]) -> bytes:
+    # metadata msgpack / JSON cannot encode raises TypeError instead of being saved some other way
+    if msgpack is not None:
+        return _MSGPACK_MAGIC + msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload).encode('utf-8')
+
+
+def _load_meta(fh) -> Dict[str, Any]:
+    head = fh.peek(len(_MSGPACK_MAGIC))[:len(_MSGPACK_MAGIC)]
+    if head.startswith(b'{'):
+        return json.loads(fh.read().decode('utf-8'))
+    if head == _MSGPACK_MAGIC:
+        if msgpack is None:
+            raise RuntimeError('metadata was saved with msgpack, which is not installed')
+        fh.read(len(_MSGPACK_MAGIC))
+        return msgpack.unpackb(fh.read(), raw=False, strict_map_key=False)
+    raise ValueError(f'Unrecognized FAISS metadata format in {getattr(fh, "name", "file")}')
+
+
+def _uuid4_batch(n: int) -> List[str]:
+    """n random (version 4) UUID strings from a single os.urandom call."""
+    raw = os.urandom(16 * n)
+    # version=4 sets the RFC 4122 version and variant bits, exactly like uuid.uuid4()
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+
+
+def _is_ivf(index) -> bool:
+    try:
+        faiss.extract_index_ivf(index)
+        return True
+    except RuntimeError:
+        return False
+
+
+def _enable_reconstruct(index) -> None:
+    """IVF indexes need a direct map before vectors can be reconstructed by id."""
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass  # not an IVF index
+
+
+def _tune_hnsw(index) -> None:
+    hnsw = _find_hnsw(index)
+    if hnsw is not None:
+        hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        hnsw.efSearch = HNSW_EF_SEARCH
+
 
 class FaissManager:
     """Small FAISS manager for in-memory embedding storage and search.
 
-    - Keeps a FAISS index (IndexFlatL2 or IndexHNSWFlat when available wrapped in IndexIDMap)
+    - Keeps a FAISS index (IVF1,Flat or IndexHNSWFlat when available wrapped in IndexIDMap2),
+      or any `index_factory` string (e.g. "IVF256,PQ48", "OPQ64,PQ64,Refine(SQ8)") trained in a
+      background thread once enough vectors arrive
+    - HNSW indexes use efConstruction/efSearch from HNSW_EFC / HNSW_EFS (default 100 / 64);
+      search_by_vector(ef_search=...) overrides efSearch for a single query
+    - Vectors are L2-normalized on the way in and searched by inner product (cosine);
+      scores are reported as squared L2 distances between the unit vectors
     - Maps stable string IDs (UUIDs) to FAISS internal integer ids
     - Stores simple metadata per item
     - Supports saving/loading the FAISS index and metadata to disk
     """
 
-    def __init__(self, dim: int = 512, use_hnsw: bool = True):
+    def __init__(self, dim: int = 512, use_hnsw: bool = True, index_factory: Optional[str] = None,
+                 train_threshold: int = 10000, nprobe: int = 16, refine_k_factor: int = 4,
+                 omp_threads: Optional[int] = None, background_train: bool = True):
         self.dim = dim
         self.lock = threading.Lock()
 
-        # core index: try HNSW for faster queries, fallback to IndexFlatL2
-        if use_hnsw and hasattr(faiss, 'IndexHNSWFlat'):
-            base_index = faiss.IndexHNSWFlat(dim, 32)
+        # Indexes built from `index_factory` (IVF / PQ) must be trained on real
+        # data. Until `train_threshold` vectors were added they are buffered in an
+        # exact flat index, then the factory index is trained in a background thread
+        # (adds and searches keep using the buffer meanwhile) and swapped in.
+        # Short-lived processes pass background_train=False (a daemon thread dies at exit,
+        # losing the work): the add that makes training due then trains, outside the lock.
+        self.index_factory = index_factory
+        self.train_threshold = train_threshold
+        self.nprobe = nprobe
+        self.refine_k_factor = refine_k_factor
+        # OpenMP threads per search (None = FAISS default, all cores). Servers answering
+        # many concurrent single queries set 1 to avoid thread oversubscription.
+        self.omp_threads = omp_threads
+        self._pending_factory = index_factory
+        self.background_train = background_train
+        self._training = False  # a training run is in progress
+        self._train_thread: Optional[threading.Thread] = None
+        self._train_at = train_threshold  # buffer size that starts the next training attempt
+
+        # core index: try HNSW for faster queries, fallback to exhaustive search.
+        # The fallback is a single-list IVF ("IVF1,Flat"): same exact results as
+        # IndexFlatIP, but its on-disk layout can be memory-mapped by load(mmap=True).
+        if index_factory:
+            base_index = faiss.IndexFlatIP(dim)
+        elif use_hnsw and hasattr(faiss, 'IndexHNSWFlat'):
+            base_index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
         else:
-            base_index = faiss.IndexFlatL2(dim)
+            base_index = faiss.index_factory(dim, 'IVF1,Flat', faiss.METRIC_INNER_PRODUCT)
+            # a single list needs no clustering: give it one (zero) centroid up front
+            # instead of letting the first add run k-means on one point
+            ivf = faiss.extract_index_ivf(base_index)
+            ivf.quantizer.add(np.zeros((1, dim), dtype=np.float32))
+            ivf.is_trained = True
 
-        # wrap with IDMap so we can assign our own integer ids
-        self.index = faiss.IndexIDMap(base_index)
+        _tune_hnsw(base_index)
+        _enable_reconstruct(base_index)
+
+        # wrap with IDMap2 so we can assign our own integer ids and reconstruct
+        # stored vectors by id (no separate copy of the embeddings is kept)
+        self.index = faiss.IndexIDMap2(base_index)
 
         # mappings and metadata
         self._next_idx = 1  # monotonic integer for faiss ids
         self.idx_to_uid: Dict[int, str] = {}
         self.uid_to_idx: Dict[str, int] = {}
         self.metadata: Dict[str, Dict[str, Any]] = {}
-        # store original embeddings (uid -> list[float]) so we can reconstruct queries reliably
-        self.embeddings: Dict[str, List[float]] = {}
-        # map file hash (sha256) -> uid for quick duplicate detection
+        # map file content hash (sha256 / blake3) -> uid for quick duplicate detection
         self.hash_to_uid: Dict[str, str] = {}
+        # set when the index was memory-mapped read-only by load(mmap=True)
+        self.read_only = False
+        # vectors added since the last save / load, and when that was (see save_if_dirty)
+        self._dirty = 0
+        self._last_save = time.monotonic()
+
+    def _normalized(self, vecs: np.ndarray) -> np.ndarray:
+        """Unit-normalized copy of `vecs` for inner-product indexes (indexes saved with L2 are left as is)."""
+        if self.index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            return vecs
+        vecs = np.array(vecs, dtype=np.float32, order='C')  # copy: never modify the caller's array
+        faiss.normalize_L2(vecs)
+        return vecs
+
+    def _prepare_add(self, vecs: np.ndarray) -> None:
+        """Called under the lock before inserting: refuse read-only maps, train IVF lazily."""
+        if self.read_only:
+            raise RuntimeError('Index was loaded memory-mapped (read-only); reload with mmap=False to add')
+        if not self.index.is_trained:
+            # untrained single-list IVF saved by older versions: any data trains it
+            self.index.train(vecs)
+
+    def _insert(self, vecs: np.ndarray, ids: np.ndarray) -> None:
+        """Called under the lock: add vectors to the current index."""
+        self.index.add_with_ids(vecs, ids)
+        self._dirty += len(ids)
+
+    def _start_training_if_due(self) -> bool:
+        """Called under the lock after an add: start training the factory index once it is due.
+
+        Returns True if the caller must run the training itself (background_train=False)
+        after releasing the lock.
+        """
+        if not (self._pending_factory and not self._training and self.index.ntotal >= self._train_at):
+            return False
+        self._training = True
+        if not self.background_train:
+            return True
+        self._train_thread = threading.Thread(target=self._run_training, name='faiss-train', daemon=True)
+        self._train_thread.start()
+        return False
+
+    def _run_training(self) -> None:
+        factory = self._pending_factory
+        print(f"[INFO] Training FAISS index '{factory}' on {self.index.ntotal} vectors...")
+        try:
+            self._build_trained_index()
+            failed = False
+        except Exception as e:
+            failed = True
+            print(f"[WARN] Training FAISS index '{factory}' failed ({e}); vectors stay in the exact buffer")
+        with self.lock:
+            self._training = False
+            if failed:
+                # more data may fix it (e.g. too few points for the IVF list count): retry at twice the size
+                self._train_at = 2 * max(self.index.ntotal, self.train_threshold)
+
+    def _buffered(self, buffer: Any, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Called under the lock: copy the unit vectors and ids at positions [start, end) of the buffer."""
+        ids = faiss.vector_to_array(buffer.id_map)[start:end].astype(np.int64)
+        _enable_reconstruct(buffer.index)
+        vecs = buffer.index.reconstruct_n(start, end - start)
+        faiss.normalize_L2(vecs)  # a buffer loaded from an older L2 index holds raw vectors
+        return vecs, ids
+
+    def _build_trained_index(self, sample: Optional[np.ndarray] = None) -> bool:
+        """Train the `index_factory` index (on `sample`, else on the buffered vectors) and move them over.
+
+        Training and re-adding the snapshot run without the lock, so adds and searches
+        continue on the buffer; vectors added meanwhile are copied over when the trained
+        index is swapped in. If anything raises, the buffer is left untouched.
+        Returns False if there was nothing to train or the index was replaced meanwhile.
+        """
+        with self.lock:
+            factory = self._pending_factory
+            if not factory:
+                return False
+            buffer = self.index
+            n = buffer.ntotal
+            vecs, ids = self._buffered(buffer, 0, n)
+
+        target = faiss.index_factory(self.dim, factory, faiss.METRIC_INNER_PRODUCT)
+        _tune_hnsw(target)
+        target.train(vecs if sample is None else sample)
+        try:
+            faiss.extract_index_ivf(target).nprobe = self.nprobe
+        except RuntimeError:
+            pass  # not an IVF index
+        if hasattr(target, 'k_factor'):
+            target.k_factor = self.refine_k_factor  # "...,Refine(...)": rerank k * k_factor first-pass hits
+
+        _enable_reconstruct(target)
+
+        trained = faiss.IndexIDMap2(target)
+        if n:
+            trained.add_with_ids(vecs, ids)
+
+        with self.lock:
+            if self.index is not buffer or self._pending_factory != factory:
+                return False  # load() or another training replaced the index meanwhile
+            if buffer.ntotal > n:
+                trained.add_with_ids(*self._buffered(buffer, n, buffer.ntotal))
+            self.index = trained
+            self._pending_factory = None
+            self._dirty += 1  # the index changed even if nothing was added
+        return True
+
+    def train(self, sample: Any) -> None:
+        """Train the index now on a representative `sample` (N x dim) instead of waiting for
+        `train_threshold` adds; anything buffered so far is moved into the trained index.
+
+        Large IVF factories (e.g. "IVF1024_HNSW32,PQ32") want tens of thousands of
+        training vectors, which a sample from an existing corpus can provide up front.
+        """
+        vecs = np.array(sample, dtype=np.float32, order='C')
+        if vecs.ndim != 2 or vecs.shape[1] != self.dim:
+            raise ValueError(f'Sample shape {vecs.shape} does not match index dim {self.dim}')
+        faiss.normalize_L2(vecs)
+
+        with self.lock:
+            if self.read_only:
+                raise RuntimeError('Index was loaded memory-mapped (read-only); reload with mmap=False to train')
+            pending = bool(self._pending_factory)
+            if not pending and not self.index.is_trained:
+                self.index.train(vecs)
+                self._dirty += 1
+        if pending:
+            self._build_trained_index(sample=vecs)
 
     def add(self, embedding: List[float], metadata: Optional[Dict[str, Any]] = None, file_hash: Optional[str] = None) -> str:
         """Add an embedding and optional metadata. Returns a stable UUID string id."""
-        if not embedding:
+        if embedding is None or len(embedding) == 0:
             raise ValueError('Empty embedding')
         vec = np.asarray(embedding, dtype=np.float32)
         if vec.ndim == 1:
             vec = vec.reshape(1, -1)
         if vec.shape[1] != self.dim:
             raise ValueError(f'Embedding dimension {vec.shape[1]} does not match index dim {self.dim}')
+        vec = self._normalized(vec)
 
         with self.lock:
+            self._prepare_add(vec)
             idx = self._next_idx
             self._next_idx += 1
             uid = str(uuid.uuid4())
 
             ids = np.array([idx], dtype=np.int64)
-            self.index.add_with_ids(vec, ids)
+            self._insert(vec, ids)
 
             self.idx_to_uid[idx] = uid
             self.uid_to_idx[uid] = idx
             self.metadata[uid] = metadata or {}
-            # store embedding as plain list for persistence
-            self.embeddings[uid] = vec.flatten().astype(float).tolist()
             if file_hash:
                 try:
                     self.hash_to_uid[file_hash] = uid
                 except Exception:
                     pass
+            train_now = self._start_training_if_due()
 
+        if train_now:
+            self._run_training()
         return uid
 
-    def search_by_vector(self, query: List[float], k: int = 5) -> List[Tuple[str, float, Dict[str, Any]]]:
-        """Search by a query vector. Returns list of (uid, distance, metadata)."""
+    def add_batch(self, embeddings: Any, metadatas: Optional[List[Dict[str, Any]]] = None,
+                  file_hashes: Optional[List[Optional[str]]] = None) -> List[str]:
+        """Add N embeddings (N x dim) with one lock acquisition and a single FAISS call.
+
+        `file_hashes` (optional, entries may be None) are registered for get_uid_by_hash.
+        Returns the new UUIDs in input order.
+        """
+        vecs = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if vecs.ndim == 1:
+            vecs = vecs.reshape(1, -1)
+        if vecs.ndim != 2 or vecs.shape[1] != self.dim:
+            raise ValueError(f'Embeddings shape {vecs.shape} does not match index dim {self.dim}')
+        n = vecs.shape[0]
+        if metadatas is not None and len(metadatas) != n:
+            raise ValueError('metadatas length does not match number of embeddings')
+        if file_hashes is not None and len(file_hashes) != n:
+            raise ValueError('file_hashes length does not match number of embeddings')
+        if n == 0:
+            return []
+        vecs = self._normalized(vecs)
+
+        with self.lock:
+            self._prepare_add(vecs)
+            start = self._next_idx
+            self._next_idx += n
+            uids = _uuid4_batch(n)
+
+            ids = np.arange(start, start + n, dtype=np.int64)
+            self._insert(vecs, ids)
+
+            self.idx_to_uid.update(zip(range(start, start + n), uids))
+            self.uid_to_idx.update(zip(uids, range(start, start + n)))
+            if metadatas is None:
+                self.metadata.update((uid, {}) for uid in uids)
+            else:
+                self.metadata.update((uid, meta or {}) for uid, meta in zip(uids, metadatas))
+            if file_hashes is not None:
+                self.hash_to_uid.update((h, uid) for h, uid in zip(file_hashes, uids) if h)
+            train_now = self._start_training_if_due()
+
+        if train_now:
+            self._run_training()
+        return uids
+
+    def finish_training(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a running background training. Call before the process exits: the
+        thread is a daemon, so exiting would discard the work and the next launch would
+        train from scratch. Returns True if a training was running.
+        """
+        thread = self._train_thread
+        if thread is None or not thread.is_alive():
+            return False
+        thread.join(timeout)
+        return True
+
+    @property
+    def dirty(self) -> bool:
+        """True while there are changes (adds, a trained index swapped in) not saved yet."""
+        return self._dirty > 0
+
+    def _search(self, q: np.ndarray, k: int):
+        """Called under the lock: index.search with this manager's OpenMP thread count."""
+        threads = self.omp_threads
+        if threads and q.shape[0] > 1:
+            threads = max(threads, BATCH_OMP_THREADS)  # batches amortize the thread fan-out
+        if threads:
+            # the OpenMP thread count is per calling thread, so set it for each request thread
+            faiss.omp_set_num_threads(threads)
+        return self.index.search(q, k)
+
+    def _iter_results(self, dists, idxs) -> Iterator[Tuple[str, float, Dict[str, Any]]]:
+        """Lazily turn one row of FAISS output into (uid, distance, metadata) tuples."""
+        # drop empty slots (id -1) first: with inner product their score is -FLT_MAX,
+        # which would overflow float32 in the conversion below
+        found = idxs >= 0
+        dists, idxs = dists[found], idxs[found]
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            # cosine similarity of unit vectors -> squared L2 distance (smaller is closer)
+            dists = np.maximum(2.0 - 2.0 * dists, 0.0)
+        # a row holds only k entries: one tolist() each is cheaper than boxing numpy scalars
+        for dist, idx in zip(dists.tolist(), idxs.tolist()):
+            uid = self.idx_to_uid.get(idx)
+            yield uid, dist, (self.metadata.get(uid, {}) if uid else {})
+
+    def _collect_results(self, dists, idxs) -> List[Tuple[str, float, Dict[str, Any]]]:
+        return list(self._iter_results(dists, idxs))
+
+    def search_by_vector(self, query: List[float], k: int = 5,
+                         ef_search: Optional[int] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Search by a query vector. Returns list of (uid, distance, metadata).
+
+        `ef_search` overrides HNSW efSearch for this query only (ignored for non-HNSW indexes).
+        """
+        return list(self.iter_search_by_vector(query, k, ef_search=ef_search))
+
+    def iter_search_by_vector(self, query: List[float], k: int = 5,
+                              ef_search: Optional[int] = None) -> Iterator[Tuple[str, float, Dict[str, Any]]]:
+        """Like search_by_vector, but yields results lazily (e.g. `next(...)` for the top hit only)."""
         q = np.asarray(query, dtype=np.float32)
         if q.ndim == 1:
             q = q.reshape(1, -1)
         if q.shape[1] != self.dim:
             raise ValueError('Query dimension mismatch')
+        q = self._normalized(q)
+
+        with self.lock:
+            if self.index.ntotal == 0:
+                return iter(())
+            hnsw = _find_hnsw(self.index) if ef_search else None
+            if hnsw is None:
+                D, I = self._search(q, k)
+            else:
+                default_ef = hnsw.efSearch
+                hnsw.efSearch = int(ef_search)
+                try:
+                    D, I = self._search(q, k)
+                finally:
+                    hnsw.efSearch = default_ef
+
+        return self._iter_results(D[0], I[0])
+
+    def search_batch(self, queries: Any, k: int = 5) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """Search N query vectors with a single FAISS call. Returns one result list per query."""
+        q = np.ascontiguousarray(queries, dtype=np.float32)
+        if q.ndim == 1:
+            q = q.reshape(1, -1)
+        if q.shape[1] != self.dim:
+            raise ValueError('Query dimension mismatch')
+        q = self._normalized(q)
 
         with self.lock:
             if self.index.ntotal == 0:
-                return []
-            D, I = self.index.search(q, k)
-
-        results: List[Tuple[str, float, Dict[str, Any]]] = []
-        for dist, idx in zip(D[0].tolist(), I[0].tolist()):
-            if idx < 0:
-                continue
-            uid = self.idx_to_uid.get(int(idx))
-            meta = self.metadata.get(uid, {}) if uid else {}
-            results.append((uid, float(dist), meta))
-        return results
+                return [[] for _ in range(q.shape[0])]
+            D, I = self._search(q, k)
+
+        return [self._collect_results(D[row], I[row]) for row in range(q.shape[0])]
 
     def get_uid_by_hash(self, file_hash: str) -> Optional[str]:
-        """Return stored uid for a given file SHA256 hash, or None if not present."""
+        """Return stored uid for a given file content hash, or None if not present."""
         return self.hash_to_uid.get(file_hash)
 
     def find_duplicate_by_embedding(self, query: List[float], threshold: float = 1e-6) -> Optional[Tuple[str, float]]:
         """Check whether a query vector has a nearby stored neighbor within `threshold` distance.
 
+        The default threshold only catches exact duplicates in indexes that store vectors
+        exactly (flat / HNSW, or a factory index still buffering before training). Once a
+        compressed factory index (PQ / SQ) is trained, distances include quantization error
+        and an identical vector can come back well above 1e-6 (around 3e-4 with
+        "OPQ64,PQ64,Refine(SQ8)", 0.4 with "OPQ48,IVF256,PQ48"): pass a threshold suited
+        to the index, or use get_uid_by_hash to find identical files.
+
         Returns (uid, distance) if found, otherwise None.
         """
-        res = self.search_by_vector(query, k=1)
-        if not res:
+        top = next(self.iter_search_by_vector(query, k=1), None)
+        if top is None:
             return None
-        uid, dist, _ = res[0]
+        uid, dist, _ = top
         if dist <= float(threshold):
             return uid, dist
         return None
 
+    def _reconstruct(self, idx: int) -> np.ndarray:
+        """Read a stored vector back out of the index (PQ/SQ indexes return their decoded approximation)."""
+        with self.lock:
+            try:
+                if isinstance(self.index, faiss.IndexIDMap2):
+                    return self.index.reconstruct(int(idx))
+                # plain IndexIDMap saved by older versions: find the vector's position by id
+                pos = np.flatnonzero(faiss.vector_to_array(self.index.id_map) == int(idx))
+                if pos.size:
+                    return self.index.index.reconstruct(int(pos[0]))
+            except RuntimeError as e:
+                raise RuntimeError(f'Cannot reconstruct embedding from index: {e}')
+        raise RuntimeError('Embedding for uid not stored; cannot perform uid-based search')
+
     def search_by_uid(self, uid: str, k: int = 5) -> List[Tuple[str, float, Dict[str, Any]]]:
         """Lookup embedding by uid and search nearest neighbors (excluding the query item itself)."""
         idx = self.uid_to_idx.get(uid)
         if idx is None:
             raise KeyError('uid not found')
-        # use stored embedding if available
-        emb_list = self.embeddings.get(uid)
-        if emb_list is None:
-            raise RuntimeError('Embedding for uid not stored; cannot perform uid-based search')
-        res = self.search_by_vector(emb_list, k + 1)
+        res = self.search_by_vector(self._reconstruct(idx), k + 1)
         # filter out self (same uid)
         filtered = [r for r in res if r[0] != uid]
         return filtered[:k]
 
     def save(self, index_path: str, meta_path: str) -> None:
-        """Persist FAISS index and metadata to disk."""
+        """Persist FAISS index and metadata to disk (each file replaced atomically)."""
         with self.lock:
-            faiss.write_index(self.index, index_path)
             payload = {
                 'next_idx': self._next_idx,
                 'idx_to_uid': self.idx_to_uid,
                 'metadata': self.metadata,
-                'embeddings': self.embeddings,
                 'hash_to_uid': self.hash_to_uid,
+                'pending_factory': self._pending_factory,
             }
-            with open(meta_path, 'w', encoding='utf-8') as fh:
-                json.dump(payload, fh)
+            # binary msgpack (plain JSON if it is not installed): far faster and smaller than JSON.
+            # Encoded first, so unencodable metadata fails before either file is replaced.
+            meta = _dump_meta(payload)
+            with atomic_write(index_path) as fh:
+                fh.write(faiss.serialize_index(self.index))
+            with atomic_write(meta_path) as fh:
+                fh.write(meta)
+            self._dirty = 0
+            self._last_save = time.monotonic()
 
-    def load(self, index_path: str, meta_path: str) -> None:
-        """Load FAISS index and metadata from disk."""
+    def save_if_dirty(self, index_path: str, meta_path: str, interval_s: float = 30.0,
+                      max_pending: int = 100) -> bool:
+        """Save only when there are unsaved adds and either `max_pending` of them piled up
+        or `interval_s` seconds passed since the last save (a FAISS index file has no
+        append, every save rewrites it). Pass interval_s=0 for a final flush.
+        Returns True if it saved.
+        """
+        with self.lock:
+            due = self._dirty > 0 and (self._dirty >= max_pending
+                                       or time.monotonic() - self._last_save >= interval_s)
+        if due:
+            self.save(index_path, meta_path)
+        return due
+
+    def load(self, index_path: str, meta_path: str, mmap: bool = False) -> None:
+        """Load FAISS index and metadata from disk.
+
+        With mmap=True the inverted lists of IVF indexes are memory-mapped
+        read-only instead of copied into RAM (pages are faulted in on demand and
+        shared between processes); adding to such an index raises. Other index
+        types (HNSW, flat) cannot be mapped and are read normally and stay writable.
+        """
         with self.lock:
-            idx = faiss.read_index(index_path)
+            if mmap:
+                idx = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            else:
+                idx = faiss.read_index(index_path)
+            # look inside the IDMap: extract_index_ivf does not see through IDMap2 + PreTransform (OPQ)
+            self.read_only = mmap and _is_ivf(idx.index if isinstance(idx, faiss.IndexIDMap) else idx)
             # wrap in IDMap if not already
             if not isinstance(idx, faiss.IndexIDMap):
-                idx = faiss.IndexIDMap(idx)
+                idx = faiss.IndexIDMap2(idx)
+            elif not self.read_only:
+                _enable_reconstruct(idx.index)
+            _tune_hnsw(idx)
             self.index = idx
-            with open(meta_path, 'r', encoding='utf-8') as fh:
-                payload = json.load(fh)
+            with open(meta_path, 'rb') as fh:
+                payload = _load_meta(fh)
             self._next_idx = int(payload.get('next_idx', 1))
             self.idx_to_uid = {int(k): v for k, v in payload.get('idx_to_uid', {}).items()}
             self.uid_to_idx = {v: int(k) for k, v in self.idx_to_uid.items()}
             self.metadata = payload.get('metadata', {})
-            self.embeddings = payload.get('embeddings', {})
             # restore hash map if present
             self.hash_to_uid = payload.get('hash_to_uid', {}) or {}
+            # older metadata predates factory indexes: treat the loaded index as the buffer
+            self._pending_factory = payload.get('pending_factory', self.index_factory)
+            self._train_at = self.train_threshold
+            self._dirty = 0
+            self._last_save = time.monotonic()
 
     def count(self) -> int:
         return int(self.index.ntotal)
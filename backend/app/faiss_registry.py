@@ -1,12 +1,39 @@
-from .faiss_manager import FaissManager
 import os
 
+# must be set before faiss (and its OpenMP runtime) is loaded: idle OpenMP workers
+# sleep instead of spin-waiting and burning CPU between requests
+os.environ.setdefault('OMP_WAIT_POLICY', 'PASSIVE')
+
+import faiss
+
+from .faiss_manager import FaissManager
+
 FAISS_USE_HNSW = os.getenv('FAISS_USE_HNSW', 'false').lower() in ('1', 'true', 'yes')
+# FAISS_OMP_THREADS: OpenMP threads per single-query search. The server already runs
+# requests in parallel, so the default of 1 avoids OpenMP thread thrash under load;
+# multi-query search_batch calls still fan out (FAISS_BATCH_OMP_THREADS).
+FAISS_OMP_THREADS = int(os.getenv('FAISS_OMP_THREADS', '1'))
+faiss.omp_set_num_threads(FAISS_OMP_THREADS)
+# FAISS_SQ=1: store CLIP vectors as 8-bit scalar codes in an HNSW graph: 512 bytes per
+# vector instead of 2048 as float32 (the graph links add about 256 bytes either way)
+FAISS_SQ = os.getenv('FAISS_SQ', 'false').lower() in ('1', 'true', 'yes')
+VISION_SQ_FACTORY = 'HNSW32,SQ8'
+# FAISS_FACTORY / FAISS_TEXT_FACTORY: any faiss index_factory string for the vision / text
+# index, e.g. "IVF1024_HNSW32,PQ32" for corpora of millions of vectors. Such indexes are
+# trained once FAISS_TRAIN_SIZE vectors were added (raise it for large IVF lists) or
+# earlier via FaissManager.train(sample).
+FAISS_FACTORY = os.getenv('FAISS_FACTORY') or None
+FAISS_TEXT_FACTORY = os.getenv('FAISS_TEXT_FACTORY') or None
+FAISS_TRAIN_SIZE = int(os.getenv('FAISS_TRAIN_SIZE', 10000))
 
 # Text embeddings (MiniLM)
-text_faiss = FaissManager(dim=384, use_hnsw=FAISS_USE_HNSW)
+text_faiss = FaissManager(dim=384, use_hnsw=FAISS_USE_HNSW, index_factory=FAISS_TEXT_FACTORY,
+                          train_threshold=FAISS_TRAIN_SIZE, omp_threads=FAISS_OMP_THREADS)
 
 # Image / Video / Audio embeddings (CLIP)
-vision_faiss = FaissManager(dim=512, use_hnsw=FAISS_USE_HNSW)
+vision_faiss = FaissManager(dim=512, use_hnsw=FAISS_USE_HNSW,
+                            index_factory=FAISS_FACTORY or (VISION_SQ_FACTORY if FAISS_SQ else None),
+                            train_threshold=FAISS_TRAIN_SIZE, omp_threads=FAISS_OMP_THREADS)
+
 
 __all__ = ["text_faiss", "vision_faiss"]
@@ -1,52 +1,188 @@
 import os
+import contextlib
+import hashlib
+import io
+import mmap
 import tempfile
 import shutil
 import re
-from typing import Optional, List
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, List, Tuple
 
+import numpy as np
 from PIL import Image
 import piexif
 import imagehash
 
+try:
+    import hyperscan  # optional: single-pass multi-pattern prefilter for the secret scanner
+except ImportError:
+    hyperscan = None
+
+try:
+    import blake3  # fast content hashing for the embedding cache keys
+except ImportError:
+    blake3 = None
+
+from .storage import atomic_write
+
 # ------------------ MODEL CACHES ------------------
+CLIP_MODEL_ID = 'clip-ViT-B-32'
+TEXT_MODEL_ID = 'all-MiniLM-L6-v2'
+
 _CLIP_MODEL = None
 _TEXT_MODEL = None
 _YOLO_MODEL = None
+# serializes first loads: concurrent requests must not each load their own copy
+_MODEL_LOCK = threading.Lock()
+
+
+# EMBED_CPU_BF16=1: bfloat16 autocast for CPU inference (only a win on CPUs with
+# native BF16 support such as AVX512-BF16 / AMX, so it is opt-in)
+_CPU_BF16 = os.getenv('EMBED_CPU_BF16', 'false').lower() in ('1', 'true', 'yes')
+
+
+def _prepare_model(model):
+    """Eval mode, plus fp16 weights when running on a CUDA GPU."""
+    model = model.eval()
+    try:
+        import torch
+        torch.set_float32_matmul_precision('high')  # allow TF32 matmuls on GPUs that have them
+        if torch.cuda.is_available():
+            model = model.half()  # SentenceTransformer already placed it on CUDA
+    except Exception:
+        pass
+    return model
+
+
+def _inference_mode():
+    """torch.inference_mode() (no autograd bookkeeping) plus fp16 (CUDA) / opt-in bf16 (CPU) autocast."""
+    try:
+        import torch
+    except Exception:
+        return contextlib.nullcontext()
+    stack = contextlib.ExitStack()
+    stack.enter_context(torch.inference_mode())
+    if torch.cuda.is_available():
+        # fp16 weights (see _prepare_model): autocast casts the fp32 inputs to match
+        stack.enter_context(torch.autocast('cuda', dtype=torch.float16))
+    elif _CPU_BF16:
+        stack.enter_context(torch.autocast('cpu', dtype=torch.bfloat16))
+    return stack
+
+
+def _encode(model, inputs, **kwargs) -> np.ndarray:
+    """model.encode() under _inference_mode(); always returns float32 numpy (fp16/bf16 outputs are upcast)."""
+    with _inference_mode():
+        out = model.encode(inputs, convert_to_tensor=True, **kwargs)
+    return out.float().cpu().numpy()
 
 
 def _load_clip():
     global _CLIP_MODEL
     if _CLIP_MODEL is None:
-        try:
-            from sentence_transformers import SentenceTransformer
-            _CLIP_MODEL = SentenceTransformer('clip-ViT-B-32')
-        except Exception:
-            _CLIP_MODEL = None
+        with _MODEL_LOCK:
+            if _CLIP_MODEL is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    _CLIP_MODEL = _prepare_model(SentenceTransformer(CLIP_MODEL_ID))
+                except Exception:
+                    _CLIP_MODEL = None
     return _CLIP_MODEL
 
 
 def _load_text_model():
     global _TEXT_MODEL
     if _TEXT_MODEL is None:
-        try:
-            from sentence_transformers import SentenceTransformer
-            _TEXT_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-        except Exception:
-            _TEXT_MODEL = None
+        with _MODEL_LOCK:
+            if _TEXT_MODEL is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    _TEXT_MODEL = _prepare_model(SentenceTransformer(TEXT_MODEL_ID))
+                except Exception:
+                    _TEXT_MODEL = None
     return _TEXT_MODEL
 
 
 def _load_yolo():
     global _YOLO_MODEL
     if _YOLO_MODEL is None:
-        try:
-            from ultralytics import YOLO
-            _YOLO_MODEL = YOLO("yolov8n.pt")
-        except Exception:
-            _YOLO_MODEL = None
+        with _MODEL_LOCK:
+            if _YOLO_MODEL is None:
+                try:
+                    from ultralytics import YOLO
+                    _YOLO_MODEL = YOLO("yolov8n.pt")
+                except Exception:
+                    _YOLO_MODEL = None
     return _YOLO_MODEL
 
 
+# ------------------ EMBEDDING CACHE ------------------
+# content-addressed: {dir}/{model_id}/{key[:2]}/{key}.npy, key = hash of the input bytes;
+# the model id in the path invalidates entries when a model is swapped.
+# OSINT_EMBED_CACHE="" disables the cache.
+EMBED_CACHE_DIR = os.getenv('OSINT_EMBED_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'osint_embed'))
+
+
+def _content_hasher():
+    return blake3.blake3() if blake3 is not None else hashlib.blake2b(digest_size=32)
+
+
+def _bytes_key(data) -> str:
+    h = _content_hasher()
+    h.update(data)
+    return h.hexdigest()
+
+
+def _array_key(arr: np.ndarray) -> str:
+    h = _content_hasher()
+    h.update(f"{arr.shape}{arr.dtype}".encode())
+    h.update(np.ascontiguousarray(arr).data)
+    return h.hexdigest()
+
+
+def _cache_path(model_id: str, key: str) -> str:
+    return os.path.join(EMBED_CACHE_DIR, model_id, key[:2], key + '.npy')
+
+
+def _cache_get(model_id: str, key: str) -> Optional[np.ndarray]:
+    try:
+        return np.load(_cache_path(model_id, key), allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_put(model_id: str, key: str, emb: np.ndarray) -> None:
+    path = _cache_path(model_id, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path) as fh:
+            np.save(fh, np.asarray(emb, dtype=np.float32), allow_pickle=False)
+    except OSError:
+        pass  # the cache is best effort
+
+
+def _encode_cached(model, model_id: str, keys: List[str], make_inputs, **kwargs) -> np.ndarray:
+    """Like _encode(), but only inputs whose key misses the cache reach the model.
+
+    `make_inputs(indices)` builds the model inputs for the given positions.
+    """
+    if not EMBED_CACHE_DIR:
+        return _encode(model, make_inputs(list(range(len(keys)))), **kwargs)
+
+    rows = [_cache_get(model_id, k) for k in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if missing:
+        embs = _encode(model, make_inputs(missing), **kwargs)
+        for i, emb in zip(missing, embs):
+            _cache_put(model_id, keys[i], emb)
+            rows[i] = emb
+    return np.stack(rows).astype(np.float32, copy=False)
+
+
 # ------------------ EXIF ------------------
 def extract_exif(path: str) -> dict:
     result = {}
@@ -100,8 +236,11 @@ def compute_image_embedding(path: str) -> List[float]:
     model = _load_clip()
     if model is not None:
         try:
-            img = Image.open(path).convert('RGB')
-            return model.encode(img, convert_to_numpy=True).tolist()
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            emb = _encode_cached(model, CLIP_MODEL_ID, [_bytes_key(data)],
+                                 lambda _: [Image.open(io.BytesIO(data)).convert('RGB')])
+            return emb[0].tolist()
         except:
             pass
 
@@ -113,62 +252,318 @@ def compute_image_embedding(path: str) -> List[float]:
         return []
 
 
+def compute_image_embeddings_batch(paths: List[str], batch_size: int = 16) -> np.ndarray:
+    """Embed many images with a single model call (CLIP runs them `batch_size` at a time).
+
+    Returns an (N, dim) float32 array, or an (N, 0) array when no consistent
+    embedding could be computed.
+    """
+    if not paths:
+        return np.empty((0, 0), dtype=np.float32)
+
+    model = _load_clip()
+    if model is not None:
+        try:
+            keys = []
+            for p in paths:
+                with open(p, 'rb') as fh:
+                    keys.append(_bytes_key(fh.read()))
+            return _encode_cached(model, CLIP_MODEL_ID, keys,
+                                  lambda idx: [Image.open(paths[i]).convert('RGB') for i in idx],
+                                  batch_size=batch_size)
+        except:
+            pass
+
+    rows = [compute_image_embedding(p) for p in paths]
+    if all(rows) and len({len(r) for r in rows}) == 1:
+        return np.asarray(rows, dtype=np.float32)
+    return np.empty((len(paths), 0), dtype=np.float32)
+
+
+def compute_image_embedding_from_array(arr: np.ndarray) -> List[float]:
+    """Same as compute_image_embedding, for an already decoded RGB (H, W, 3) uint8 frame."""
+    img = Image.fromarray(arr)
+    model = _load_clip()
+    if model is not None:
+        try:
+            return _encode_cached(model, CLIP_MODEL_ID, [_array_key(arr)], lambda _: [img])[0].tolist()
+        except:
+            pass
+
+    try:
+        h = int(str(imagehash.phash(img)), 16)
+        return [(h >> i) & 0xFFFF for i in range(0, 128, 16)]
+    except:
+        return []
+
+
+def compute_image_embeddings_from_arrays(arrays: List[np.ndarray], batch_size: int = 16) -> np.ndarray:
+    """Batched compute_image_embedding_from_array; same return contract as compute_image_embeddings_batch."""
+    if not arrays:
+        return np.empty((0, 0), dtype=np.float32)
+
+    model = _load_clip()
+    if model is not None:
+        try:
+            return _encode_cached(model, CLIP_MODEL_ID, [_array_key(a) for a in arrays],
+                                  lambda idx: [Image.fromarray(arrays[i]) for i in idx],
+                                  batch_size=batch_size)
+        except:
+            pass
+
+    rows = [compute_image_embedding_from_array(a) for a in arrays]
+    if all(rows) and len({len(r) for r in rows}) == 1:
+        return np.asarray(rows, dtype=np.float32)
+    return np.empty((len(arrays), 0), dtype=np.float32)
+
+
 # ------------------ VIDEO FRAMES ------------------
-def extract_frames(video_path: str, out_dir: Optional[str] = None, fps: int = 1) -> List[str]:
-    import cv2
+def _iter_frames_ffmpeg(ffmpeg: str, video_path: str, out_dir: str, fps: int) -> Iterator[str]:
+    """Let ffmpeg decimate to `fps` inside the decoder (hardware decode when available)."""
+    pattern = os.path.join(out_dir, "frame_%05d.jpg")
+    proc = subprocess.Popen(
+        [ffmpeg, '-nostdin', '-loglevel', 'error', '-hwaccel', 'auto', '-i', video_path,
+         '-vf', f'fps={fps}', '-q:v', '3', '-start_number', '0', pattern],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    count = 0
+    try:
+        # frame N is complete once frame N+1 exists (or ffmpeg has exited)
+        while True:
+            if os.path.exists(pattern % (count + 1)):
+                yield pattern % count
+                count += 1
+            elif proc.poll() is not None:
+                break
+            else:
+                time.sleep(0.02)
+        while os.path.exists(pattern % count):
+            yield pattern % count
+            count += 1
+        if proc.returncode != 0 and count == 0:
+            raise RuntimeError("Cannot open video")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
 
-    if out_dir is None:
-        out_dir = tempfile.mkdtemp(prefix='frames_')
+
+def _iter_cv2_frames(video_path: str, fps: int) -> Iterator[np.ndarray]:
+    """Decode about `fps` frames per second of video with OpenCV (BGR arrays)."""
+    import cv2
 
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise RuntimeError("Cannot open video")
 
-    fps_video = cap.get(cv2.CAP_PROP_FPS) or 25
-    step = max(1, int(fps_video / fps))
+    try:
+        fps_video = cap.get(cv2.CAP_PROP_FPS) or 25
+        step = max(1, int(fps_video / fps))
 
-    saved = []
-    idx = 0
-    count = 0
+        idx = 0
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+        # grab() advances without converting the frame; only kept frames are retrieved
+        while cap.grab():
+            if idx % step == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield frame
+            idx += 1
+    finally:
+        cap.release()
 
-        if idx % step == 0:
-            path = os.path.join(out_dir, f"frame_{count:05d}.jpg")
-            cv2.imwrite(path, frame)
-            saved.append(path)
-            count += 1
-        idx += 1
 
-    cap.release()
-    return saved
+def _iter_frames_cv2(video_path: str, out_dir: str, fps: int) -> Iterator[str]:
+    import cv2
+
+    for count, frame in enumerate(_iter_cv2_frames(video_path, fps)):
+        path = os.path.join(out_dir, f"frame_{count:05d}.jpg")
+        cv2.imwrite(path, frame)
+        yield path
+
+
+def iter_frames(video_path: str, out_dir: Optional[str] = None, fps: int = 1) -> Iterator[str]:
+    """Yield frame image paths as they are written, so callers can overlap decode and processing.
+
+    Uses ffmpeg's fps filter when ffmpeg is on PATH, OpenCV otherwise.
+    """
+    if out_dir is None:
+        out_dir = tempfile.mkdtemp(prefix='frames_')
+    os.makedirs(out_dir, exist_ok=True)
+
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        return _iter_frames_ffmpeg(ffmpeg, video_path, out_dir, fps)
+    return _iter_frames_cv2(video_path, out_dir, fps)
+
+
+def extract_frames(video_path: str, out_dir: Optional[str] = None, fps: int = 1) -> List[str]:
+    return list(iter_frames(video_path, out_dir=out_dir, fps=fps))
+
+
+def _iter_frame_arrays_ffmpeg(ffmpeg: str, video_path: str, fps: int) -> Iterator[np.ndarray]:
+    # PPM over a pipe: each frame is a tiny text header (size) plus raw RGB bytes.
+    # rgb24 is forced: for 10-bit sources (HDR/HEVC) ffmpeg would otherwise emit 16-bit PPMs
+    proc = subprocess.Popen(
+        [ffmpeg, '-nostdin', '-loglevel', 'error', '-hwaccel', 'auto', '-i', video_path,
+         '-vf', f'fps={fps}', '-pix_fmt', 'rgb24', '-f', 'image2pipe', '-vcodec', 'ppm', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1 << 20,
+    )
+    count = 0
+    try:
+        while True:
+            magic = proc.stdout.readline()  # b"P6\n"
+            if not magic:
+                break
+            width, height = map(int, proc.stdout.readline().split())
+            maxval = proc.stdout.readline().strip()
+            if maxval != b'255':
+                raise RuntimeError(f"Unexpected PPM max value {maxval!r} from ffmpeg (expected 8-bit RGB)")
+            size = width * height * 3
+            data = proc.stdout.read(size)
+            if len(data) < size:
+                break
+            yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+            count += 1
+        proc.wait()
+        if proc.returncode != 0 and count == 0:
+            raise RuntimeError("Cannot open video")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+
+def iter_frame_arrays(video_path: str, fps: int = 1) -> Iterator[np.ndarray]:
+    """Yield sampled frames as RGB (H, W, 3) uint8 arrays without writing images to disk."""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        yield from _iter_frame_arrays_ffmpeg(ffmpeg, video_path, fps)
+        return
+    for frame in _iter_cv2_frames(video_path, fps):
+        yield np.ascontiguousarray(frame[..., ::-1])  # BGR -> RGB
+
+
+def iter_distinct_frames(frame_paths: Iterable[str], min_distance: int = 6) -> Iterator[Tuple[int, str]]:
+    """Yield (frame_index, path) for frames worth embedding; near-duplicates of the last kept frame are dropped.
+
+    Uses the 64-bit perceptual hash; a frame is kept when its Hamming distance
+    to the previously kept frame is at least `min_distance` bits.
+    """
+    last_hash = None
+    for idx, path in enumerate(frame_paths):
+        try:
+            h = imagehash.phash(Image.open(path))
+        except:
+            yield idx, path
+            continue
+        if last_hash is not None and h - last_hash < min_distance:
+            continue
+        last_hash = h
+        yield idx, path
 
 
 # ------------------ SECRET SCANNER ------------------
+# [^\r\n] rather than `.`: files are matched as bytes, where `.` would also take the
+# `\r` of CRLF line ends (text mode used to turn every line end into `\n`)
+_SECRET_PATTERNS = [
+    re.compile(r'API[_-]?KEY\s*[=:]\s*["\']?[^\r\n]{16,}["\']?', re.I),
+    re.compile(r'SECRET[_-]?KEY\s*[=:]\s*["\']?[^\r\n]{8,}["\']?', re.I),
+    re.compile(r'password\s*[=:]\s*["\']?[^\r\n]{6,}["\']?', re.I),
+]
+# bytes versions, matched directly against memory-mapped files
+_SECRET_PATTERNS_BYTES = [re.compile(p.pattern.encode(), re.I) for p in _SECRET_PATTERNS]
+
+
+def _compile_secret_db():
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.pattern.encode() for p in _SECRET_PATTERNS],
+            ids=list(range(len(_SECRET_PATTERNS))),
+            elements=len(_SECRET_PATTERNS),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(_SECRET_PATTERNS),
+        )
+        return db
+    except Exception:
+        return None
+
+
+# all secret patterns in one Hyperscan database: a file is scanned once and only
+# the patterns that actually occur in it are re-run with `re` to extract the matches
+_SECRET_DB = _compile_secret_db()
+# Hyperscan scratch space must not be shared between concurrently scanning threads
+_hs_local = threading.local()
+
+
+def _secret_patterns_in(data) -> List[re.Pattern]:
+    if _SECRET_DB is None:
+        return _SECRET_PATTERNS_BYTES
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_SECRET_DB)
+    hits = set()
+
+    def on_match(pattern_id, start, end, flags, context):
+        hits.add(pattern_id)
+
+    _SECRET_DB.scan(data, match_event_handler=on_match, scratch=scratch)
+    return [p for i, p in enumerate(_SECRET_PATTERNS_BYTES) if i in hits]
+
+
+# files that never hold hand-written secrets are skipped before any of their bytes are read
+_SCAN_MAX_BYTES = 2_000_000
+_SCAN_SKIP_DIRS = {'node_modules', 'vendor', 'dist', '.git'}
+_SCAN_SKIP_SUFFIXES = (
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.svg',
+    '.pdf', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.jar',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.mp3', '.mp4', '.wav', '.avi', '.mov', '.mkv',
+    '.exe', '.dll', '.so', '.dylib', '.o', '.a', '.pyc', '.class', '.bin',
+    '.min.js', '.min.css', '.map', '.lock',
+)
+
+
+def _scan_one(path: str) -> List[dict]:
+    findings = []
+    try:
+        with open(path, 'rb') as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size == 0 or size > _SCAN_MAX_BYTES:
+                return findings  # empty files cannot be mapped; huge ones are data, not config
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if b'\0' in data[:8192]:
+                    return findings  # NUL byte in the head: binary file
+                for p in _secret_patterns_in(data):
+                    for m in p.finditer(data):
+                        findings.append({"file": path, "match": m.group(0).decode(errors='ignore')})
+    except:
+        pass
+    return findings
+
+
 def scan_git_repo_for_secrets(repo_path: str) -> List[dict]:
+    paths = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in _SCAN_SKIP_DIRS]  # prune: never descend into them
+        paths.extend(os.path.join(root, f) for f in files if not f.lower().endswith(_SCAN_SKIP_SUFFIXES))
+
+    # With Hyperscan, file reads and the prefilter scan release the GIL (Python `re`
+    # only runs on the rare files that hit), so files are scanned concurrently.
+    # Without it every file is a `re` pass holding the GIL, where threads would only
+    # add overhead, so files are scanned in order. Both keep the findings in walk order.
     findings = []
-    patterns = [
-        r'API[_-]?KEY\s*[=:]\s*["\']?.{16,}["\']?',
-        r'SECRET[_-]?KEY\s*[=:]\s*["\']?.{8,}["\']?',
-        r'password\s*[=:]\s*["\']?.{6,}["\']?'
-    ]
-
-    compiled = [re.compile(p, re.I) for p in patterns]
-
-    for root, _, files in os.walk(repo_path):
-        for f in files:
-            path = os.path.join(root, f)
-            try:
-                with open(path, 'r', errors='ignore') as fh:
-                    data = fh.read()
-                    for p in compiled:
-                        for m in p.finditer(data):
-                            findings.append({"file": path, "match": m.group(0)})
-            except:
-                pass
+    if _SECRET_DB is None:
+        for file_findings in map(_scan_one, paths):
+            findings.extend(file_findings)
+        return findings
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+        for file_findings in pool.map(_scan_one, paths):
+            findings.extend(file_findings)
     return findings
 
 
@@ -205,6 +600,25 @@ def scan_git_repo_for_secrets_with_reports(repo_path, repo_url=None):
 
 
 # ------------------ YOLO OBJECT DETECTION ------------------
+def _parse_detections(model, result, conf_thresh):
+    detections = []
+    for box in result.boxes:
+        conf = float(box.conf[0])
+        if conf < conf_thresh:
+            continue
+
+        cls_id = int(box.cls[0])
+        label = model.names.get(cls_id, str(cls_id))
+        x1, y1, x2, y2 = map(int, box.xyxy[0])
+
+        detections.append({
+            "label": label,
+            "confidence": round(conf, 4),
+            "bbox": [x1, y1, x2, y2]
+        })
+    return detections
+
+
 def detect_objects_in_image(image_path, conf_thresh=0.25):
     model = _load_yolo()
     if model is None:
@@ -214,38 +628,45 @@ def detect_objects_in_image(image_path, conf_thresh=0.25):
     detections = []
 
     for r in results:
-        for box in r.boxes:
-            conf = float(box.conf[0])
-            if conf < conf_thresh:
-                continue
+        detections.extend(_parse_detections(model, r, conf_thresh))
 
-            cls_id = int(box.cls[0])
-            label = model.names.get(cls_id, str(cls_id))
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
+    return detections
 
-            detections.append({
-                "label": label,
-                "confidence": round(conf, 4),
-                "bbox": [x1, y1, x2, y2]
-            })
 
+def detect_objects_in_images(image_paths: List, conf_thresh=0.25, batch_size: int = 16) -> List[list]:
+    """Run YOLO on several images (paths or BGR arrays) in batched forward passes; one detection list per image."""
+    model = _load_yolo()
+    if model is None:
+        return [[{"error": "YOLO not available"}] for _ in image_paths]
+
+    detections = []
+    for start in range(0, len(image_paths), batch_size):
+        results = model(list(image_paths[start:start + batch_size]))
+        detections.extend(_parse_detections(model, r, conf_thresh) for r in results)
     return detections
 
 
 # ------------------ TEXT OSINT ------------------
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_PHONE_RE = re.compile(r"\+?\d[\d -]{8,12}\d")
+_USER_RE = re.compile(r"@[\w_]+")
+_CRED_RE = re.compile(r"(password|passwd|pwd)[\s:=]+[\S]+", re.I)
+
+
 def analyze_text_osint(text: str) -> dict:
     return {
-        "emails": re.findall(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", text),
-        "phones": re.findall(r"\+?\d[\d -]{8,12}\d", text),
-        "usernames": re.findall(r"@[\w_]+", text),
-        "possible_credentials": re.findall(r"(password|passwd|pwd)[\s:=]+[\S]+", text, re.I)
+        "emails": _EMAIL_RE.findall(text),
+        "phones": _PHONE_RE.findall(text),
+        "usernames": _USER_RE.findall(text),
+        "possible_credentials": _CRED_RE.findall(text)
     }
 
 
 def compute_text_embedding(text: str) -> list:
     model = _load_text_model()
     if model:
-        return model.encode(text).tolist()
+        emb = _encode_cached(model, TEXT_MODEL_ID, [_bytes_key(text.encode('utf-8'))], lambda _: [text])
+        return emb[0].tolist()
     return []
 
 
@@ -255,22 +676,27 @@ def analyze_audio(path: str) -> dict:
     try:
         import librosa, numpy as np, speech_recognition as sr
 
-        y, sr_rate = librosa.load(path, sr=None)
+        # decode once at 16 kHz mono (plenty for centroid / ZCR and what speech APIs expect);
+        # the low-quality soxr resampler is much faster and good enough for these features
+        y, sr_rate = librosa.load(path, sr=16000, mono=True, res_type='soxr_lq')
+        # one STFT, handed to spectral_centroid instead of letting it compute its own
+        S = np.abs(librosa.stft(y, n_fft=2048, hop_length=512))
         result["spectral_features"] = {
-            "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr_rate))),
-            "zero_crossing_rate": float(np.mean(librosa.feature.zero_crossing_rate(y)))
+            "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(S=S, sr=sr_rate))),
+            "zero_crossing_rate": float(np.mean(librosa.feature.zero_crossing_rate(y, frame_length=2048, hop_length=512)))
         }
 
         env = "Urban / Traffic Noise" if result["spectral_features"]["spectral_centroid"] > 2500 else "Indoor / Quiet"
         result["environment"].append(env)
 
         rec = sr.Recognizer()
-        with sr.AudioFile(path) as src:
-            audio = rec.record(src)
-            try:
-                result["transcript"] = rec.recognize_google(audio)
-            except:
-                pass
+        # reuse the decoded samples as 16-bit PCM instead of decoding the file a second time
+        pcm = (np.clip(y, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+        audio = sr.AudioData(pcm, sr_rate, 2)
+        try:
+            result["transcript"] = rec.recognize_google(audio)
+        except:
+            pass
     except Exception as e:
         result["error"] = str(e)
 
@@ -0,0 +1,29 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'wb', **kwargs):
+    """Open a temp file next to `path`; on success fsync it and os.replace() it over `path`.
+
+    A crash mid-write leaves the previous file intact instead of a torn one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fh = tempfile.NamedTemporaryFile(mode, dir=directory, prefix=os.path.basename(path) + '.',
+                                     suffix='.tmp', delete=False, **kwargs)
+    try:
+        with fh:
+            yield fh
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(fh.name, path)
+    except BaseException:
+        try:
+            os.remove(fh.name)
+        except OSError:
+            pass
+        raise
+
+
+__all__ = ['atomic_write']
@@ -1,8 +1,10 @@
 # cli.py 
 import argparse
+import atexit
 import os
 import sys
 import json
+import shutil
 import tempfile
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,20 +15,27 @@ from backend.app.ingest import (
     extract_frames,
     scan_git_repo_for_secrets
 )
-from backend.app.faiss_manager import FaissManager
+from backend.app.faiss_manager import IMAGE_INDEX_FACTORY, FaissManager
 
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
 INDEX_PATH = os.path.join(DATA_DIR, 'index.faiss')
-META_PATH = os.path.join(DATA_DIR, 'faiss_meta.json')
+META_PATH = os.path.join(DATA_DIR, 'faiss_meta.msgpack')
+LEGACY_META_PATH = os.path.join(DATA_DIR, 'faiss_meta.json')
 os.makedirs(DATA_DIR, exist_ok=True)
 
-faiss_manager = FaissManager(dim=512)
-if os.path.exists(INDEX_PATH) and os.path.exists(META_PATH):
+# same index files as the UI, so the same factory. One command per process: training runs
+# in the add that makes it due instead of a background thread that exiting would kill.
+faiss_manager = FaissManager(dim=512, index_factory=IMAGE_INDEX_FACTORY, background_train=False)
+_meta_path = META_PATH if os.path.exists(META_PATH) else LEGACY_META_PATH
+if os.path.exists(INDEX_PATH) and os.path.exists(_meta_path):
     try:
-        faiss_manager.load(INDEX_PATH, META_PATH)
+        faiss_manager.load(INDEX_PATH, _meta_path)
     except Exception:
         print("[WARN] Could not load FAISS index; continuing with empty index.")
 
+# adds are saved in batches (see cmd_image); write whatever is left on exit
+atexit.register(faiss_manager.save_if_dirty, INDEX_PATH, META_PATH, 0)
+
 def cmd_image(path: str, persist: bool):
     print('[*] Processing image:', path)
     exif = extract_exif(path)
@@ -40,7 +49,7 @@ def cmd_image(path: str, persist: bool):
                 print(f"[WARN] Embedding dim {len(emb)} != FAISS dim {faiss_manager.dim}; not stored.")
             else:
                 uid = faiss_manager.add(emb, metadata={"filename": os.path.basename(path)})
-                faiss_manager.save(INDEX_PATH, META_PATH)
+                faiss_manager.save_if_dirty(INDEX_PATH, META_PATH)
                 print(f'[+] Stored in FAISS with ID: {uid}')
         except Exception as e:
             print("[ERROR] Failed to store embedding:", e)